@@ -1,38 +1,82 @@
+import asyncio
+
 from fastapi import FastAPI, HTTPException
-from typing import List
+from fastapi.responses import ORJSONResponse
 from models import (
-    Product, PurchaseRequest, InventoryResponse, 
+    Product, PurchaseRequest, BatchPurchaseRequest,
     ProductResponse, PurchaseResponse, CategoryEnum
 )
 from utils import (
-    load_data, save_data, get_inventory_status, 
-    restock_if_needed, log_operation
+    load_data, save_data, flush_state, drain_log_queue,
+    get_inventory_status, get_priority_code, get_restock_amount,
+    inventory_view, refresh_restock_amount, refresh_status,
+    restock_if_needed, log_operation, STATE_LOCK
 )
 
 app = FastAPI(title="Mini Inventory Management System", version="1.0.0")
 
+# How often the background task checks for unflushed inventory changes.
+FLUSH_INTERVAL_SECONDS = 0.1
+
+_flush_task = None
+
+async def _flush_loop():
+    """Periodically persist dirty inventory state, coalescing bursts of writes.
+
+    The serialize-and-write runs on a worker thread so the event loop is
+    never blocked on disk while requests are in flight.
+    """
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(flush_state)
+        except Exception:
+            # flush_state already logged the failure; keep the loop alive
+            # so a transient disk error does not stop future flushes.
+            pass
+
+@app.on_event("startup")
+async def load_inventory_state():
+    """Load the inventory into memory once and start the background flusher."""
+    global _flush_task
+    load_data()
+    _flush_task = asyncio.create_task(_flush_loop())
+
+@app.on_event("shutdown")
+async def flush_inventory_state():
+    """Stop the flusher and write any pending changes before exit."""
+    if _flush_task is not None:
+        _flush_task.cancel()
+    flush_state()
+    drain_log_queue()
+
 @app.post("/products", response_model=ProductResponse)
 def add_product(product: Product):
     """Add a new product to the inventory with automatic business rule application."""
     data = load_data()
 
-    # Check if product already exists
-    if product.product_id in data:
-        log_operation("ADD_PRODUCT_FAILED", product.product_id, {"reason": "Product already exists"})
-        raise HTTPException(status_code=400, detail="Product already exists")
+    with STATE_LOCK:
+        # Check if product already exists
+        if product.product_id in data:
+            log_operation("ADD_PRODUCT_FAILED", product.product_id, {"reason": "Product already exists"})
+            raise HTTPException(status_code=400, detail="Product already exists")
 
-    # Apply business rule: High priority products must have min_threshold >= 10
-    if product.priority == "high" and product.min_threshold < 10:
-        product.min_threshold = 10
-        log_operation("BUSINESS_RULE_APPLIED", product.product_id, 
-                     {"rule": "high_priority_min_threshold", "new_threshold": 10})
+        # Apply business rule: High priority products must have min_threshold >= 10
+        if product.priority == "high" and product.min_threshold < 10:
+            product.min_threshold = 10
+            log_operation("BUSINESS_RULE_APPLIED", product.product_id,
+                         {"rule": "high_priority_min_threshold", "new_threshold": 10})
 
-    # Apply business rule: Auto-assign category based on restock_quantity
-    product.category = CategoryEnum.high_volume if product.restock_quantity > 50 else CategoryEnum.low_volume
+        # Apply business rule: Auto-assign category based on restock_quantity
+        product.category = CategoryEnum.high_volume if product.restock_quantity > 50 else CategoryEnum.low_volume
 
-    # Save product
-    data[product.product_id] = product.dict()
-    save_data(data)
+        # Save product
+        entry = product.model_dump()
+        refresh_status(entry)
+        refresh_restock_amount(entry)
+        get_priority_code(entry)
+        data[product.product_id] = entry
+        save_data(data)
 
     log_operation("ADD_PRODUCT", product.product_id, {
         "name": product.name,
@@ -43,86 +87,76 @@ def add_product(product: Product):
 
     return ProductResponse(message="Product added successfully", product=product)
 
-@app.get("/inventory/{product_id}", response_model=InventoryResponse)
+@app.get("/inventory/{product_id}")
 def inventory_status(product_id: str):
     """Get the current inventory status of a specific product."""
     data = load_data()
-    
-    if product_id not in data:
+
+    product = data.get(product_id)
+    if product is None:
         log_operation("INVENTORY_CHECK_FAILED", product_id, {"reason": "Product not found"})
         raise HTTPException(status_code=404, detail="Product not found")
 
-    product = data[product_id]
     status = get_inventory_status(product)
-    
+
     log_operation("INVENTORY_CHECK", product_id, {
         "stock_quantity": product["stock_quantity"],
         "status": status
     })
 
-    return InventoryResponse(
-        product_id=product["product_id"],
-        stock_quantity=product["stock_quantity"],
-        status=status,
-        priority=product["priority"]
-    )
+    # Hot read path: return a plain dict instead of revalidating through
+    # a pydantic model -- the data already came in validated.
+    return {
+        "product_id": product["product_id"],
+        "stock_quantity": product["stock_quantity"],
+        "status": status,
+        "priority": product["priority"]
+    }
 
-@app.get("/inventory", response_model=List[InventoryResponse])
+@app.get("/inventory")
 def get_all_inventory():
     """Get inventory status for all products."""
-    data = load_data()
-    
-    if not data:
-        log_operation("GET_ALL_INVENTORY", "ALL", {"count": 0})
-        return []
-
-    results = []
-    for product_id, product in data.items():
-        status = get_inventory_status(product)
-        results.append(InventoryResponse(
-            product_id=product["product_id"],
-            stock_quantity=product["stock_quantity"],
-            status=status,
-            priority=product["priority"]
-        ))
-    
+    results = inventory_view()
     log_operation("GET_ALL_INVENTORY", "ALL", {"count": len(results)})
-    return results
+    # Serialize the cached view straight through orjson, skipping
+    # FastAPI's jsonable_encoder pass over every row.
+    return ORJSONResponse(results)
 
 @app.post("/purchase/{product_id}", response_model=PurchaseResponse)
 def purchase_product(product_id: str, purchase_request: PurchaseRequest):
     """Purchase a specified quantity of a product and trigger automatic restocking if needed."""
     data = load_data()
-    
-    if product_id not in data:
-        log_operation("PURCHASE_FAILED", product_id, {"reason": "Product not found"})
-        raise HTTPException(status_code=404, detail="Product not found")
 
-    product = data[product_id]
-    quantity = purchase_request.quantity
-
-    # Check if sufficient stock is available
-    if product["stock_quantity"] < quantity:
-        log_operation("PURCHASE_FAILED", product_id, {
-            "reason": "Insufficient stock",
-            "requested": quantity,
-            "available": product["stock_quantity"]
-        })
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Insufficient stock. Available: {product['stock_quantity']}, Requested: {quantity}"
-        )
-
-    # Process the purchase
-    old_stock = product["stock_quantity"]
-    product["stock_quantity"] -= quantity
-    
-    # Check if restocking is needed
-    restock_triggered = restock_if_needed(product)
-    
-    # Save updated data
-    data[product_id] = product
-    save_data(data)
+    with STATE_LOCK:
+        product = data.get(product_id)
+        if product is None:
+            log_operation("PURCHASE_FAILED", product_id, {"reason": "Product not found"})
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        quantity = purchase_request.quantity
+
+        # Check if sufficient stock is available
+        if product["stock_quantity"] < quantity:
+            log_operation("PURCHASE_FAILED", product_id, {
+                "reason": "Insufficient stock",
+                "requested": quantity,
+                "available": product["stock_quantity"]
+            })
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock. Available: {product['stock_quantity']}, Requested: {quantity}"
+            )
+
+        # Process the purchase
+        old_stock = product["stock_quantity"]
+        product["stock_quantity"] -= quantity
+
+        # Check if restocking is needed
+        restock_triggered = restock_if_needed(product)
+        refresh_status(product)
+
+        # Save updated data
+        save_data(data)
 
     log_operation("PURCHASE", product_id, {
         "quantity_purchased": quantity,
@@ -137,30 +171,90 @@ def purchase_product(product_id: str, purchase_request: PurchaseRequest):
         restock_triggered=restock_triggered
     )
 
+@app.post("/purchase-batch")
+def purchase_batch(batch: BatchPurchaseRequest):
+    """Purchase multiple products in one request with a single coalesced save."""
+    data = load_data()
+
+    results = []
+    purchased = 0
+    with STATE_LOCK:
+        for item in batch.items:
+            product = data.get(item.product_id)
+            if product is None:
+                log_operation("PURCHASE_FAILED", item.product_id, {"reason": "Product not found"})
+                results.append({
+                    "product_id": item.product_id,
+                    "success": False,
+                    "detail": "Product not found"
+                })
+                continue
+
+            if product["stock_quantity"] < item.quantity:
+                log_operation("PURCHASE_FAILED", item.product_id, {
+                    "reason": "Insufficient stock",
+                    "requested": item.quantity,
+                    "available": product["stock_quantity"]
+                })
+                results.append({
+                    "product_id": item.product_id,
+                    "success": False,
+                    "detail": f"Insufficient stock. Available: {product['stock_quantity']}, Requested: {item.quantity}"
+                })
+                continue
+
+            old_stock = product["stock_quantity"]
+            product["stock_quantity"] -= item.quantity
+
+            restock_triggered = restock_if_needed(product)
+            refresh_status(product)
+            purchased += 1
+
+            log_operation("PURCHASE", item.product_id, {
+                "quantity_purchased": item.quantity,
+                "stock_before": old_stock,
+                "stock_after": product["stock_quantity"],
+                "restock_triggered": restock_triggered
+            })
+
+            results.append({
+                "product_id": item.product_id,
+                "success": True,
+                "remaining_stock": product["stock_quantity"],
+                "restock_triggered": restock_triggered
+            })
+
+        # One coalesced save for the whole batch instead of one per item
+        if purchased:
+            save_data(data)
+
+    log_operation("PURCHASE_BATCH", "ALL", {
+        "items": len(batch.items),
+        "purchased": purchased
+    })
+
+    return {"message": "Batch purchase completed", "results": results}
+
 @app.post("/restock/{product_id}")
 def manual_restock(product_id: str):
     """Manually trigger restocking for a specific product."""
     data = load_data()
-    
-    if product_id not in data:
-        log_operation("MANUAL_RESTOCK_FAILED", product_id, {"reason": "Product not found"})
-        raise HTTPException(status_code=404, detail="Product not found")
 
-    product = data[product_id]
-    old_stock = product["stock_quantity"]
-    
-    # Force restock regardless of current stock level
-    restock_qty = product["restock_quantity"]
-    if product["priority"] == "high":
-        actual_restock = int(restock_qty * 1.2)
-    elif product["category"] == "high_volume":
-        actual_restock = int(restock_qty * 1.1)
-    else:
-        actual_restock = restock_qty
-    
-    product["stock_quantity"] += actual_restock
-    data[product_id] = product
-    save_data(data)
+    with STATE_LOCK:
+        product = data.get(product_id)
+        if product is None:
+            log_operation("MANUAL_RESTOCK_FAILED", product_id, {"reason": "Product not found"})
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        old_stock = product["stock_quantity"]
+
+        # Force restock regardless of current stock level, using the
+        # amount precomputed at write time
+        actual_restock = get_restock_amount(product)
+
+        product["stock_quantity"] += actual_restock
+        refresh_status(product)
+        save_data(data)
 
     log_operation("MANUAL_RESTOCK", product_id, {
         "stock_before": old_stock,
@@ -176,6 +270,38 @@ def manual_restock(product_id: str):
         "restock_quantity": actual_restock
     }
 
+@app.post("/restock-scan")
+def restock_scan():
+    """Scan the entire catalog and restock every product that qualifies."""
+    data = load_data()
+
+    restocked = []
+    with STATE_LOCK:
+        for product_id, product in data.items():
+            old_stock = product["stock_quantity"]
+            if restock_if_needed(product):
+                refresh_status(product)
+                restocked.append({
+                    "product_id": product_id,
+                    "stock_before": old_stock,
+                    "stock_after": product["stock_quantity"]
+                })
+
+        # One batched save for the whole sweep instead of one per product
+        if restocked:
+            save_data(data)
+
+    log_operation("RESTOCK_SCAN", "ALL", {
+        "scanned": len(data),
+        "restocked": len(restocked)
+    })
+
+    return {
+        "message": "Restock scan completed",
+        "scanned": len(data),
+        "restocked": restocked
+    }
+
 @app.get("/")
 def root():
     """Welcome endpoint with API information."""
@@ -187,6 +313,8 @@ def root():
             "GET /inventory/{product_id}": "Get product inventory status",
             "GET /inventory": "Get all products inventory status",
             "POST /purchase/{product_id}": "Purchase product",
-            "POST /restock/{product_id}": "Manual restock product"
+            "POST /purchase-batch": "Purchase multiple products in one request",
+            "POST /restock/{product_id}": "Manual restock product",
+            "POST /restock-scan": "Restock all products that qualify"
         }
     }
\ No newline at end of file
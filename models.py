@@ -1,5 +1,5 @@
-from pydantic import BaseModel, validator
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import List, Optional
 from enum import Enum
 
 class PriorityEnum(str, Enum):
@@ -7,6 +7,10 @@ class PriorityEnum(str, Enum):
     medium = "medium"
     low = "low"
 
+# Integer codes for hot-path priority comparisons; the string enum stays
+# on the API surface.
+PRIORITY_CODES = {"high": 0, "medium": 1, "low": 2}
+
 class CategoryEnum(str, Enum):
     high_volume = "high_volume"
     low_volume = "low_volume"
@@ -17,6 +21,8 @@ class StatusEnum(str, Enum):
     out_of_stock = "out_of_stock"
 
 class Product(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
     product_id: str
     name: str
     stock_quantity: int
@@ -25,7 +31,8 @@ class Product(BaseModel):
     priority: PriorityEnum
     category: Optional[CategoryEnum] = None
 
-    @validator('stock_quantity', 'min_threshold', 'restock_quantity')
+    @field_validator('stock_quantity', 'min_threshold', 'restock_quantity')
+    @classmethod
     def validate_positive_numbers(cls, v):
         if v < 0:
             raise ValueError('Values must be non-negative')
@@ -34,12 +41,27 @@ class Product(BaseModel):
 class PurchaseRequest(BaseModel):
     quantity: int
 
-    @validator('quantity')
+    @field_validator('quantity')
+    @classmethod
     def validate_quantity(cls, v):
         if v <= 0:
             raise ValueError('Quantity must be positive')
         return v
 
+class BatchPurchaseItem(BaseModel):
+    product_id: str
+    quantity: int
+
+    @field_validator('quantity')
+    @classmethod
+    def validate_quantity(cls, v):
+        if v <= 0:
+            raise ValueError('Quantity must be positive')
+        return v
+
+class BatchPurchaseRequest(BaseModel):
+    items: List[BatchPurchaseItem]
+
 class InventoryResponse(BaseModel):
     product_id: str
     stock_quantity: int
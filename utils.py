@@ -1,60 +1,201 @@
-import json
 import logging
-from os.path import exists
-from datetime import datetime
-from typing import Dict, Any
-
-# Configure logging for traceability
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('inventory.log'),
-        logging.StreamHandler()
-    ]
+import os
+import queue
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+from typing import Dict, Any, List, Optional
+
+from models import PRIORITY_CODES
+
+# Configure logging for traceability. Records go through a queue drained
+# on a listener thread, so a log call on the request path is a queue.put
+# rather than a blocking file (or stderr) write.
+_log_file_handler = logging.FileHandler('inventory.log', delay=True)
+_log_file_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+_log_handlers = [_log_file_handler]
+if os.environ.get("DEV"):
+    _stream_handler = logging.StreamHandler()
+    _stream_handler.setFormatter(_log_file_handler.formatter)
+    _log_handlers.append(_stream_handler)
+
+_log_record_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_record_queue, *_log_handlers)
+_log_listener.start()
+
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(_log_record_queue))
+
+# Computed once at import: skips f-string construction for disabled levels
+# on the hot paths below.
+_INFO_ON = logger.isEnabledFor(logging.INFO)
 
 DATA_FILE = "inventory_store.json"
 
+# In-process inventory state. Loaded from disk once (at startup or on first
+# access) and mutated in place by the handlers; STATE_LOCK guards mutations
+# from concurrent requests.
+_STATE: Optional[Dict[str, Any]] = None
+STATE_LOCK = threading.RLock()
+
+# Set by save_data() and cleared by flush_state(); lets the background
+# flusher coalesce many logical writes into one disk write.
+_DIRTY = False
+
+# Cached response list for GET /inventory, rebuilt lazily after a write.
+_VIEW: Optional[List[Dict[str, Any]]] = None
+
 def load_data() -> Dict[str, Any]:
-    """Load inventory data from JSON file with error handling and logging."""
-    try:
-        if not exists(DATA_FILE):
-            logger.info(f"Data file {DATA_FILE} does not exist, returning empty dict")
-            return {}
-        
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-            logger.info(f"Successfully loaded {len(data)} products from {DATA_FILE}")
-            return data
-    except Exception as e:
-        logger.error(f"Error loading data from {DATA_FILE}: {str(e)}")
-        return {}
-
-def save_data(data: Dict[str, Any]) -> None:
-    """Save inventory data to JSON file with error handling and logging."""
-    try:
-        with open(DATA_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-            logger.info(f"Successfully saved {len(data)} products to {DATA_FILE}")
-    except Exception as e:
-        logger.error(f"Error saving data to {DATA_FILE}: {str(e)}")
-        raise
+    """Return the in-memory inventory state, loading it from disk on first call."""
+    global _STATE
+    with STATE_LOCK:
+        if _STATE is not None:
+            return _STATE
 
-def get_inventory_status(product: Dict[str, Any]) -> str:
-    """Determine inventory status based on stock quantity and threshold."""
-    stock = product["stock_quantity"]
-    threshold = product["min_threshold"]
-    
+        try:
+            with open(DATA_FILE, "rb") as f:
+                _STATE = orjson.loads(f.read())
+            logger.info(f"Successfully loaded {len(_STATE)} products from {DATA_FILE}")
+        except FileNotFoundError:
+            logger.info(f"Data file {DATA_FILE} does not exist, starting with empty inventory")
+            _STATE = {}
+        except Exception as e:
+            logger.error(f"Error loading data from {DATA_FILE}: {str(e)}")
+            _STATE = {}
+        return _STATE
+
+def save_data(data: Dict[str, Any], sync: bool = False) -> None:
+    """Mark the inventory state dirty so the background flusher persists it.
+
+    Writes are coalesced: bursts of updates result in a single disk write
+    on the next flush tick. Pass sync=True to flush to disk immediately
+    for durability-sensitive operations (e.g. shutdown).
+    """
+    global _DIRTY, _VIEW
+    _DIRTY = True
+    _VIEW = None
+    if sync:
+        flush_state()
+
+def inventory_view() -> List[Dict[str, Any]]:
+    """Return the status list for all products, cached between writes.
+
+    Read-heavy workloads hit the prebuilt list; any write invalidates it
+    via save_data() and the next read rebuilds it in one pass.
+    """
+    global _VIEW
+    with STATE_LOCK:
+        if _VIEW is None:
+            _VIEW = [
+                {
+                    "product_id": product["product_id"],
+                    "stock_quantity": product["stock_quantity"],
+                    "status": get_inventory_status(product),
+                    "priority": product["priority"]
+                }
+                for product in load_data().values()
+            ]
+        return _VIEW
+
+def flush_state() -> None:
+    """Write the in-memory state to disk atomically if it has pending changes."""
+    global _DIRTY
+    with STATE_LOCK:
+        if not _DIRTY or _STATE is None:
+            return
+        try:
+            tmp_file = DATA_FILE + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(orjson.dumps(_STATE, option=orjson.OPT_INDENT_2))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, DATA_FILE)
+            _DIRTY = False
+            logger.info(f"Successfully saved {len(_STATE)} products to {DATA_FILE}")
+        except Exception as e:
+            logger.error(f"Error saving data to {DATA_FILE}: {str(e)}")
+            raise
+
+@lru_cache(maxsize=1024)
+def _compute_status(stock: int, threshold: int) -> str:
+    """Compute inventory status from a stock level and threshold.
+
+    Pure function of its arguments, so memoizing needs no invalidation:
+    the (stock, threshold) pair is the entire state.
+    """
     if stock == 0:
-        status = "out_of_stock"
-    elif stock < threshold:
-        status = "below_threshold"
-    else:
-        status = "ok"
-    
-    logger.debug(f"Product {product['product_id']}: stock={stock}, threshold={threshold}, status={status}")
+        return "out_of_stock"
+    if stock < threshold:
+        return "below_threshold"
+    return "ok"
+
+def _restock_multiplier(priority: str, category: str) -> float:
+    """Single source of truth for the restock buffer rules."""
+    if priority == "high":
+        # High priority gets full restock + 20% buffer
+        return 1.2
+    if category == "high_volume":
+        # High volume gets full restock + 10% buffer
+        return 1.1
+    # Standard restock
+    return 1.0
+
+def refresh_restock_amount(product: Dict[str, Any]) -> int:
+    """Precompute and cache the product's effective restock amount.
+
+    The priority/category multiplier is specialized once at write time,
+    so restock paths read a constant instead of re-branching per call.
+    """
+    multiplier = _restock_multiplier(product["priority"], product["category"])
+    amount = int(product["restock_quantity"] * multiplier)
+    product["restock_amount"] = amount
+    return amount
+
+def get_restock_amount(product: Dict[str, Any]) -> int:
+    """Return the cached restock amount, computing it for older snapshots."""
+    amount = product.get("restock_amount")
+    if amount is None:
+        amount = refresh_restock_amount(product)
+    return amount
+
+def get_priority_code(product: Dict[str, Any]) -> int:
+    """Return the product's integer priority code, caching it on the record.
+
+    Integer compares on the restock path are a single CPU comparison
+    instead of a string hash and memcmp per call.
+    """
+    code = product.get("priority_code")
+    if code is None:
+        code = PRIORITY_CODES[product["priority"]]
+        product["priority_code"] = code
+    return code
+
+def refresh_status(product: Dict[str, Any]) -> str:
+    """Recompute and cache the product's status after a stock or threshold change."""
+    status = _compute_status(product["stock_quantity"], product["min_threshold"])
+    product["status"] = status
+    return status
+
+def get_inventory_status(product: Dict[str, Any]) -> str:
+    """Return the product's cached inventory status, computing it if missing.
+
+    The status field is maintained by the write paths, so reads are a plain
+    dict lookup; the fallback covers products loaded from older snapshots.
+    """
+    status = product.get("status")
+    if status is None:
+        status = refresh_status(product)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Product {product['product_id']}: stock={product['stock_quantity']}, "
+                     f"threshold={product['min_threshold']}, status={status}")
     return status
 
 def should_restock(product: Dict[str, Any]) -> bool:
@@ -68,26 +209,27 @@ def should_restock(product: Dict[str, Any]) -> bool:
     """
     stock = product["stock_quantity"]
     threshold = product["min_threshold"]
-    priority = product["priority"]
-    
+
     if stock == 0:
-        logger.info(f"Product {product['product_id']} is out of stock - triggering restock")
+        if _INFO_ON:
+            logger.info(f"Product {product['product_id']} is out of stock - triggering restock")
         return True
-    
+
     if stock >= threshold:
         return False
-    
+
     # Below threshold - apply priority-based logic
-    if priority == "high":
+    priority_code = get_priority_code(product)
+    if priority_code == 0:  # high
         should_restock_flag = stock < threshold
-    elif priority == "medium":
+    elif priority_code == 1:  # medium
         should_restock_flag = stock <= (threshold * 0.5)
     else:  # low priority
         should_restock_flag = stock <= (threshold * 0.25)
-    
-    if should_restock_flag:
-        logger.info(f"Product {product['product_id']} (priority: {priority}) qualifies for restock: stock={stock}, threshold={threshold}")
-    
+
+    if should_restock_flag and _INFO_ON:
+        logger.info(f"Product {product['product_id']} (priority: {product['priority']}) qualifies for restock: stock={stock}, threshold={threshold}")
+
     return should_restock_flag
 
 def restock_if_needed(product: Dict[str, Any]) -> bool:
@@ -99,34 +241,62 @@ def restock_if_needed(product: Dict[str, Any]) -> bool:
         return False
     
     old_stock = product["stock_quantity"]
-    restock_qty = product["restock_quantity"]
-    
-    # Enhanced restock logic based on priority and category
-    if product["priority"] == "high":
-        # High priority gets full restock + 20% buffer
-        actual_restock = int(restock_qty * 1.2)
-    elif product["category"] == "high_volume":
-        # High volume gets full restock + 10% buffer
-        actual_restock = int(restock_qty * 1.1)
-    else:
-        # Standard restock
-        actual_restock = restock_qty
-    
+
+    # Precomputed at write time from priority and category
+    actual_restock = get_restock_amount(product)
+
     product["stock_quantity"] += actual_restock
     
-    logger.info(f"RESTOCK TRIGGERED - Product: {product['product_id']}, "
-               f"Priority: {product['priority']}, Category: {product['category']}, "
-               f"Stock: {old_stock} → {product['stock_quantity']} (+{actual_restock})")
+    if _INFO_ON:
+        logger.info(f"RESTOCK TRIGGERED - Product: {product['product_id']}, "
+                   f"Priority: {product['priority']}, Category: {product['category']}, "
+                   f"Stock: {old_stock} → {product['stock_quantity']} (+{actual_restock})")
     
     return True
 
+# Pending operation log entries, drained off the request path by a
+# background thread. Bounded so a stalled drain cannot grow unbounded.
+_LOG_QUEUE = deque(maxlen=100_000)
+_LOG_DRAIN_INTERVAL = 0.05
+
+# Timestamp formatting memoized per second: entries drained in the same
+# second reuse one strftime call.
+_TS_CACHE = (None, "")
+
+def _format_timestamp(timestamp: float) -> str:
+    """Format a UNIX timestamp as ISO-8601, cached at second granularity."""
+    global _TS_CACHE
+    second = int(timestamp)
+    if _TS_CACHE[0] != second:
+        _TS_CACHE = (second, time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second)))
+    return _TS_CACHE[1]
+
 def log_operation(operation: str, product_id: str, details: Dict[str, Any] = None) -> None:
-    """Log operations for audit trail and debugging."""
-    timestamp = datetime.now().isoformat()
-    log_entry = {
-        "timestamp": timestamp,
-        "operation": operation,
-        "product_id": product_id,
-        "details": details or {}
-    }
-    logger.info(f"OPERATION: {json.dumps(log_entry)}")
\ No newline at end of file
+    """Queue an operation for the audit trail.
+
+    The hot path only appends a tuple; timestamp formatting and JSON
+    serialization happen on the drain thread.
+    """
+    _LOG_QUEUE.append((time.time(), operation, product_id, details or {}))
+
+def drain_log_queue() -> None:
+    """Format and emit all queued operation log entries."""
+    while _LOG_QUEUE:
+        timestamp, operation, product_id, details = _LOG_QUEUE.popleft()
+        if not _INFO_ON:
+            continue
+        log_entry = {
+            "timestamp": _format_timestamp(timestamp),
+            "operation": operation,
+            "product_id": product_id,
+            "details": details
+        }
+        logger.info(f"OPERATION: {orjson.dumps(log_entry).decode()}")
+
+def _log_drain_loop() -> None:
+    while True:
+        time.sleep(_LOG_DRAIN_INTERVAL)
+        drain_log_queue()
+
+_log_drain_thread = threading.Thread(target=_log_drain_loop, daemon=True)
+_log_drain_thread.start()
\ No newline at end of file